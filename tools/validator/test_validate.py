@@ -0,0 +1,240 @@
+"""Tests for the IntentFlow workflow validator"""
+
+import contextlib
+import io
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+import validate
+from validate import WorkflowValidator, validate_file, validate_many
+
+
+EXAMPLES = Path(__file__).resolve().parents[2] / "examples"
+# Output of the original regex-based parser for every file in examples/
+BASELINE = json.loads(
+    (Path(__file__).parent / "testdata" / "examples_baseline.json").read_text(encoding="utf-8")
+)
+
+
+def parse(content: str) -> WorkflowValidator:
+    """Validate ``content`` and return the validator with its parsed state"""
+    validator = WorkflowValidator(content)
+    validator.validate()
+    return validator
+
+
+def step_doc(body: str, heading: str = "## Step 1: Only step") -> str:
+    """Wrap H3 sections in a minimal one-step workflow"""
+    return f"# Workflow: Test\n\n{heading}\n### Task\nDo the thing properly.\n\n{body}"
+
+
+# Examples
+
+@pytest.mark.parametrize("name", sorted(BASELINE))
+def test_examples_parse_as_before(name):
+    expected = BASELINE[name]
+    validator = WorkflowValidator((EXAMPLES / name).read_text(encoding="utf-8"))
+    result = validator.validate()
+
+    assert validator.title == expected["title"]
+    assert validator.meta == expected["meta"]
+    assert validator.context == expected["context"]
+    assert validator.finalization == expected["finalization"]
+    assert result.errors == expected["errors"]
+    assert result.warnings == expected["warnings"]
+    assert result.info == expected["info"]
+    assert len(validator.steps) == len(expected["steps"])
+    for step, old in zip(validator.steps, expected["steps"]):
+        # The old parser read '---' rules as empty bullets
+        for key in ("success_criteria", "constraints"):
+            old[key] = [item for item in old[key] if item]
+        assert {key: getattr(step, key) for key in old} == old
+
+
+def test_examples_cover_every_file():
+    assert sorted(BASELINE) == sorted(p.name for p in EXAMPLES.glob("*.md"))
+
+
+# Sections
+
+def test_h3_step_heading_is_not_a_step():
+    validator = parse("# T\n\n### Step 1: Not a step\n\n## Step 1: Real\n### Task\nDo the thing properly.\n")
+    assert [(s.number, s.title) for s in validator.steps] == [(1, "Real")]
+
+
+def test_adjacent_step_headings_are_all_counted():
+    validator = parse("# T\n\n## Step 1: First\n## Step 2: Second\n## Step 3: Third\n")
+    assert [s.number for s in validator.steps] == [1, 2, 3]
+
+
+@pytest.mark.parametrize("heading", ["## Step 1", "## Step 1:", "## step 1 "])
+def test_step_heading_without_title(heading):
+    validator = parse(step_doc("", heading=heading))
+    assert [(s.number, s.title) for s in validator.steps] == [(1, "")]
+    assert validator.steps[0].task == "Do the thing properly."
+
+
+@pytest.mark.parametrize("indent", ["", " ", "  ", "   "])
+def test_indented_headings(indent):
+    validator = parse(f"# T\n\n{indent}## Step 1: A\n{indent}### Task\nDo the thing properly.\n")
+    assert [(s.number, s.title) for s in validator.steps] == [(1, "A")]
+    assert validator.steps[0].task == "Do the thing properly."
+
+
+@pytest.mark.parametrize("heading", ["    ## Step 2: B", "##Step 2: B"])
+def test_not_a_step_heading(heading):
+    validator = parse(step_doc(f"{heading}\n"))
+    assert [s.number for s in validator.steps] == [1]
+
+
+def test_h3_heading_needs_space_after_hashes():
+    validator = parse("# T\n\n## Step 1: A\n###Task\nDo the thing properly.\n")
+    assert validator.steps[0].task is None
+
+
+def test_step_heading_keeps_title_case():
+    validator = parse(step_doc("", heading="## STEP 1: Fetch Ünïcode Data"))
+    assert validator.steps[0].title == "Fetch Ünïcode Data"
+
+
+def test_meta_and_context_inside_step_do_not_end_it():
+    validator = parse(step_doc("## Context\nSome context.\n### Constraints\n- c1\n"))
+    assert validator.context == "Some context."
+    assert validator.steps[0].constraints == ["c1"]
+
+
+def test_meta_and_context_inside_step_stay_in_open_section():
+    validator = parse("# T\n\n## Step 1: A\n### Task\nDo X\n## Context\nBackground\n"
+                      "## Meta\nversion: 1.0\n## Meta\nlater: text\n")
+    assert validator.context == "Background"
+    assert validator.meta == {"version": "1.0"}
+    assert validator.steps[0].task == "Do X\n## Context\nBackground\n## Meta\nversion: 1.0\n## Meta\nlater: text"
+
+
+def test_meta_ends_at_rule():
+    validator = parse("# T\n\n## Meta\nversion: 1.0\nauthor : Someone\n---\nnot: meta\n")
+    assert validator.meta == {"version": "1.0", "author": "Someone"}
+
+
+def test_finalization_runs_to_end():
+    validator = parse(step_doc("## Finalization\nClean up.\n\n## Notes\nMore.\n"))
+    assert validator.finalization == "Clean up.\n\n## Notes\nMore."
+
+
+# Bullets
+
+def test_rule_is_not_a_bullet():
+    validator = parse(step_doc("### Success criteria\n- one\n\n---\n"))
+    assert validator.steps[0].success_criteria == ["one"]
+
+
+def test_bullet_keeps_bold_text():
+    validator = parse(step_doc("### Constraints\n- **Never** delete data\n* second\n"))
+    assert validator.steps[0].constraints == ["**Never** delete data", "second"]
+
+
+def test_bullet_needs_space_after_marker():
+    validator = parse(step_doc("### Constraints\n-item\n**Note:** prose\n  - nested  \n"))
+    assert validator.steps[0].constraints == ["nested"]
+
+
+# Dependencies
+
+def test_dependencies_from_code_blocks():
+    validator = parse(step_doc("### Dependencies\n```bash\npip install x\n\napt-get y\n```\n"))
+    assert validator.steps[0].dependencies == ["pip install x", "apt-get y"]
+
+
+def test_dependencies_with_indented_fence():
+    deps = (
+        "### Dependencies\n"
+        "1. Install:\n   ```bash\n   pip install x\n   ```\n"
+        "2. Then:\n```bash\nnpm ci\n```\n"
+    )
+    validator = parse(step_doc(deps))
+    assert validator.steps[0].dependencies == ["pip install x", "npm ci"]
+
+
+def test_dependencies_with_fence_closed_on_command_line():
+    validator = parse(step_doc("### Dependencies\n```bash\npip install x```\n"))
+    assert validator.steps[0].dependencies == ["pip install x"]
+
+
+# Save as, Flexibility, Error handling
+
+@pytest.mark.parametrize("line", ["`/tmp/out.json`", '"/tmp/out.json"', "  /tmp/out.json  "])
+def test_save_as(line):
+    validator = parse(step_doc(f"### Save as\n\n{line}\n"))
+    assert validator.steps[0].save_as == "/tmp/out.json"
+
+
+def test_flexibility_level():
+    validator = parse(step_doc("### Flexibility [Autonomous]\nFree to choose.\n"))
+    step = validator.steps[0]
+    assert (step.flexibility_level, step.flexibility) == ("autonomous", "Free to choose.")
+
+
+def test_invalid_flexibility_level():
+    result = WorkflowValidator(step_doc("### Flexibility [wild]\nAnything.\n")).validate()
+    assert "Invalid flexibility level 'wild'" in result.errors[0]
+    assert result.errors[0].endswith("strict, guided, autonomous")
+
+
+def test_error_handling_splits_on_first_arrow():
+    validator = parse(step_doc("### If something goes wrong\n- bad → retry\n- worse -> a -> b\nno arrow\n"))
+    assert validator.steps[0].error_handling == [
+        {"condition": "bad", "action": "retry"},
+        {"condition": "worse", "action": "a -> b"},
+    ]
+
+
+# Step flow
+
+def test_gap_in_step_numbers():
+    result = WorkflowValidator("# T\n## Step 1: A\n### Task\nDo the thing properly.\n"
+                               "## Step 3: C\n### Task\nDo the other thing.\n").validate()
+    assert "Gap in step numbering detected" in result.warnings
+    assert "Step numbers are not sequential. Found: [1, 3], Expected: [1, 2]" in result.warnings
+
+
+# Files and CLI
+
+def test_validate_file_with_cr_line_endings(tmp_path):
+    path = tmp_path / "old-mac.md"
+    path.write_bytes(b"# Old Mac\r## Step 1: A\r### Task\rDo the thing properly.\r")
+    result = validate_file(str(path))
+    assert result.info["step_count"] == 1
+
+
+def test_validate_many(tmp_path):
+    path = tmp_path / "flow.md"
+    path.write_text(step_doc(""), encoding="utf-8")
+    results = validate_many([str(path), str(tmp_path / "missing.md")])
+    assert [r.valid for r in results] == [True, False]
+
+
+@pytest.mark.parametrize("tty", [True, False])
+def test_json_output_same_with_and_without_orjson(monkeypatch, tty):
+    orjson = pytest.importorskip("orjson")
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: tty)
+    output = {"valid": True, "errors": [], "info": {"title": "Wörkflow →", "step_count": 1}}
+
+    monkeypatch.setattr(validate, "orjson", orjson)
+    fast = validate._dumps(output)
+    monkeypatch.setattr(validate, "orjson", None)
+    assert validate._dumps(output) == fast
+    assert "Wörkflow →".encode("utf-8") in fast
+
+
+def test_json_output_to_text_stream(tmp_path, monkeypatch):
+    path = tmp_path / "flow.md"
+    path.write_text(step_doc("", heading="## Step 1: Wörk"), encoding="utf-8")
+    monkeypatch.setattr(sys, "argv", ["validate.py", str(path), "--json"])
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out), pytest.raises(SystemExit) as exit_info:
+        validate.main()
+    assert exit_info.value.code == 0
+    assert json.loads(out.getvalue())["valid"] is True
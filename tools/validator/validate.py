@@ -11,48 +11,91 @@ import re
 import json
 from pathlib import Path
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import Any, Iterable, Iterator, Optional
 
+try:
+    import orjson  # Optional: faster --json output
+except ImportError:
+    orjson = None  # type: ignore[assignment]
 
-@dataclass
+
+# Precompiled patterns (compiled once at import, reused for every document)
+_TITLE_RE = re.compile(r'#\s+(?:Workflow:\s*)?(.+)')
+_META_KV_RE = re.compile(r'^([^:\n]+):([^\n]*)$', re.MULTILINE)
+_STEP_HEADING_RE = re.compile(r'step\s+(\d+)(?:$|[:\s]+(.*))')
+_FLEX_HEADING_RE = re.compile(r'flexibility\s*(?:\[(\w+)\])?')
+_DEPS_CMD_RE = re.compile(r'```(?:bash|sh)?\n(.*?)```', re.DOTALL)
+_SAVE_RE = re.compile(r'[`"]?\s*([^`"\s](?:[^`"]*[^`"\s])?)')
+_BULLET_RE = re.compile(r'\s*[-*]\s+(\S(?:.*\S)?)')
+
+# Body lines of each H3 section of a step, keyed by lower-cased heading
+_Sections = dict[str, list[str]]
+
+
+def _iter_lines(text: str) -> Iterator[str]:
+    """Yield the lines of ``text`` one at a time, without building a list"""
+    start = 0
+    while start <= len(text):
+        end = text.find('\n', start)
+        if end < 0:
+            end = len(text)
+        yield text[start:end].removesuffix('\r')
+        start = end + 1
+
+
+def _heading(line: str) -> tuple[int, str]:
+    """Return the level and text of an ATX heading line, or ``(0, '')``"""
+    if not line.startswith(('#', ' ')):
+        return 0, ''
+    # Up to three spaces of indentation are allowed before the '#' run
+    text = line.lstrip(' ')
+    if len(line) - len(text) > 3:
+        return 0, ''
+    rest = text.lstrip('#')
+    if rest and not rest[0].isspace():    # "##Step 1" is not a heading
+        return 0, ''
+    return len(text) - len(rest), rest.strip()
+
+
+@dataclass(slots=True)
 class ValidationResult:
     """Result of workflow validation"""
     valid: bool
-    errors: list = field(default_factory=list)
-    warnings: list = field(default_factory=list)
-    info: dict = field(default_factory=dict)
+    errors: list[str] = field(default_factory=list)
+    warnings: list[str] = field(default_factory=list)
+    info: dict[str, Any] = field(default_factory=dict)
 
 
-@dataclass
+@dataclass(slots=True)
 class Step:
     """Parsed workflow step"""
     number: int
     title: str
     task: Optional[str] = None
-    dependencies: list = field(default_factory=list)
+    dependencies: list[str] = field(default_factory=list)
     save_as: Optional[str] = None
-    success_criteria: list = field(default_factory=list)
+    success_criteria: list[str] = field(default_factory=list)
     flexibility: Optional[str] = None
     flexibility_level: str = "guided"
-    constraints: list = field(default_factory=list)
-    error_handling: list = field(default_factory=list)
+    constraints: list[str] = field(default_factory=list)
+    error_handling: list[dict[str, str]] = field(default_factory=list)
 
 
 class WorkflowValidator:
     """Validates IntentFlow workflow documents"""
     
-    VALID_FLEXIBILITY_LEVELS = ["strict", "guided", "autonomous"]
+    VALID_FLEXIBILITY_LEVELS = frozenset({"strict", "guided", "autonomous"})
+    _FLEXIBILITY_LEVELS_TEXT = "strict, guided, autonomous"
     
-    def __init__(self, content: str):
+    def __init__(self, content: str) -> None:
         self.content = content
-        self.lines = content.split('\n')
-        self.errors = []
-        self.warnings = []
-        self.title = None
-        self.meta = {}
-        self.context = None
-        self.steps = []
-        self.finalization = None
+        self.errors: list[str] = []
+        self.warnings: list[str] = []
+        self.title: Optional[str] = None
+        self.meta: dict[str, str] = {}
+        self.context: Optional[str] = None
+        self.steps: list[Step] = []
+        self.finalization: Optional[str] = None
     
     def validate(self) -> ValidationResult:
         """Run all validations and return result"""
@@ -74,111 +117,182 @@ class WorkflowValidator:
             }
         )
     
-    def _parse_document(self):
+    def _parse_document(self) -> None:
         """Parse the markdown document into components"""
-        # Extract title (first H1)
-        title_match = re.search(r'^#\s+(?:Workflow:\s*)?(.+)$', self.content, re.MULTILINE)
-        if title_match:
-            self.title = title_match.group(1).strip()
+        # Extract title (first H1) and sections
+        title, blocks, steps = self._split_sections()
+        if title:
+            self.title = title
         
         # Extract meta section
-        meta_match = re.search(r'##\s+Meta\s*\n(.*?)(?=\n##|\n---|\Z)', self.content, re.DOTALL | re.IGNORECASE)
-        if meta_match:
-            self.meta = self._parse_meta(meta_match.group(1))
+        if 'meta' in blocks:
+            self.meta = self._parse_meta('\n'.join(blocks['meta']))
         
         # Extract context section
-        context_match = re.search(r'##\s+Context\s*\n(.*?)(?=\n##|\n---|\Z)', self.content, re.DOTALL | re.IGNORECASE)
-        if context_match:
-            self.context = context_match.group(1).strip()
+        if 'context' in blocks:
+            self.context = '\n'.join(blocks['context']).strip()
         
         # Extract steps
-        step_pattern = r'##\s+Step\s+(\d+)[:\s]+(.+?)\n(.*?)(?=\n##\s+Step|\n##\s+Finalization|\Z)'
-        for match in re.finditer(step_pattern, self.content, re.DOTALL | re.IGNORECASE):
-            step = self._parse_step(
-                int(match.group(1)),
-                match.group(2).strip(),
-                match.group(3)
-            )
+        for number, step_title, sections in steps:
+            step = self._parse_step(number, step_title, sections)
             self.steps.append(step)
         
         # Extract finalization
-        final_match = re.search(r'##\s+Finalization\s*\n(.*)$', self.content, re.DOTALL | re.IGNORECASE)
-        if final_match:
-            self.finalization = final_match.group(1).strip()
-    
-    def _parse_meta(self, content: str) -> dict:
-        """Parse meta section into key-value pairs"""
-        meta = {}
-        for line in content.strip().split('\n'):
-            if ':' in line:
-                key, value = line.split(':', 1)
-                meta[key.strip().lower()] = value.strip()
-        return meta
+        if 'finalization' in blocks:
+            self.finalization = '\n'.join(blocks['finalization']).strip()
     
-    def _parse_step(self, number: int, title: str, content: str) -> Step:
-        """Parse a step section"""
-        step = Step(number=number, title=title)
+    def _split_sections(
+        self
+    ) -> tuple[Optional[str], dict[str, list[str]], list[tuple[int, str, _Sections]]]:
+        """Split the document into sections in a single forward pass.
         
-        # Extract Task
-        task_match = re.search(r'###\s+Task\s*\n(.*?)(?=\n###|\Z)', content, re.DOTALL | re.IGNORECASE)
-        if task_match:
-            step.task = task_match.group(1).strip()
+        Returns ``(title, blocks, steps)``: ``title`` is the text of the first
+        H1 heading, ``blocks`` maps ``meta``, ``context`` and
+        ``finalization`` to their body lines, and ``steps`` lists
+        ``(number, title, sections)`` tuples where ``sections`` maps each
+        lower-cased H3 heading of the step to its body lines. Only the first
+        occurrence of a heading is kept.
         
-        # Extract Dependencies
-        deps_match = re.search(r'###\s+Dependencies\s*\n(.*?)(?=\n###|\Z)', content, re.DOTALL | re.IGNORECASE)
-        if deps_match:
-            # Extract code blocks
-            code_blocks = re.findall(r'```(?:bash|sh)?\n(.*?)```', deps_match.group(1), re.DOTALL)
-            step.dependencies = [cmd.strip() for block in code_blocks for cmd in block.strip().split('\n') if cmd.strip()]
+        A step runs until the next Step or Finalization heading. A Meta or
+        Context heading inside a step is read without ending the step, and
+        its lines stay in the open H3 section as well. Meta and Context end
+        at the next heading or ``---`` rule, and Finalization runs to the end
+        of the document.
+        """
+        title: Optional[str] = None
+        blocks: dict[str, list[str]] = {}
+        steps: list[tuple[int, str, _Sections]] = []
+        in_step = False
+        sections: _Sections = {}              # H3 sections of the current step
+        lines: Optional[list[str]] = None     # open H3 section of the step, None when skipping
+        block: Optional[list[str]] = None     # Meta or Context body being collected
+        final: Optional[list[str]] = None     # Finalization body, collects every later line
         
-        # Extract Save as
-        save_match = re.search(r'###\s+Save\s+as\s*\n[`"]?([^`"\n]+)[`"]?', content, re.IGNORECASE)
-        if save_match:
-            step.save_as = save_match.group(1).strip().strip('`"')
-        
-        # Extract Success criteria
-        criteria_match = re.search(r'###\s+Success\s+criteria\s*\n(.*?)(?=\n###|\Z)', content, re.DOTALL | re.IGNORECASE)
-        if criteria_match:
-            criteria_text = criteria_match.group(1)
-            step.success_criteria = [
-                line.strip().lstrip('- ').lstrip('* ')
-                for line in criteria_text.split('\n')
-                if line.strip() and line.strip().startswith(('-', '*'))
-            ]
-        
-        # Extract Flexibility
-        flex_match = re.search(r'###\s+Flexibility\s*(?:\[(\w+)\])?\s*\n(.*?)(?=\n###|\Z)', content, re.DOTALL | re.IGNORECASE)
-        if flex_match:
-            if flex_match.group(1):
-                step.flexibility_level = flex_match.group(1).lower()
-            step.flexibility = flex_match.group(2).strip()
+        for line in _iter_lines(self.content):
+            if final is not None:
+                final.append(line)
+            
+            level, heading = _heading(line)
+            if level >= 3:
+                block = None
+                if in_step and level == 3:
+                    key = ' '.join(heading.split()).lower()
+                    lines = None if key in sections else sections.setdefault(key, [])
+                else:
+                    lines = None
+            elif level == 2:
+                name = heading.lower()
+                # Match the lower-cased heading, slice the title from the original
+                header = _STEP_HEADING_RE.match(name) if name.startswith('step') else None
+                if header:
+                    in_step, sections, lines, block = True, {}, None, None
+                    # The title is optional ("## Step 3" or "## Step 3:")
+                    step_title = heading[header.start(2):] if header.group(2) else ''
+                    steps.append((int(header.group(1)), step_title, sections))
+                elif name == 'finalization':
+                    in_step, lines, block = False, None, None
+                    if final is None:
+                        final = blocks[name] = []
+                elif name in ('meta', 'context'):
+                    # Only the first occurrence is read; an open step section keeps the line
+                    block = None if name in blocks else blocks.setdefault(name, [])
+                    if lines is not None:
+                        lines.append(line)
+                elif in_step and not name.startswith(('step', 'finalization')):
+                    # Other H2 headings do not end a step
+                    block = None
+                    if lines is not None:
+                        lines.append(line)
+                else:
+                    in_step, lines, block = False, None, None
+            else:
+                if title is None and line.startswith('#'):
+                    title_match = _TITLE_RE.match(line)
+                    if title_match:
+                        title = title_match.group(1).strip()
+                if block is not None:
+                    if line.startswith('---'):
+                        block = None
+                    else:
+                        block.append(line)
+                if lines is not None:
+                    lines.append(line)
         
-        # Extract Constraints
-        const_match = re.search(r'###\s+Constraints\s*\n(.*?)(?=\n###|\Z)', content, re.DOTALL | re.IGNORECASE)
-        if const_match:
-            const_text = const_match.group(1)
-            step.constraints = [
-                line.strip().lstrip('- ').lstrip('* ')
-                for line in const_text.split('\n')
-                if line.strip() and line.strip().startswith(('-', '*'))
-            ]
+        return title, blocks, steps
+    
+    def _parse_meta(self, content: str) -> dict[str, str]:
+        """Parse meta section into key-value pairs"""
+        return {
+            m.group(1).strip().lower(): m.group(2).strip()
+            for m in _META_KV_RE.finditer(content)
+        }
+    
+    def _parse_step(self, number: int, title: str, sections: _Sections) -> Step:
+        """Parse a step from its H3 sections"""
+        step = Step(number=number, title=title)
+        has_flexibility = False
         
-        # Extract Error handling
-        error_match = re.search(r'###\s+If\s+something\s+goes\s+wrong\s*\n(.*?)(?=\n###|\Z)', content, re.DOTALL | re.IGNORECASE)
-        if error_match:
-            error_text = error_match.group(1)
-            for line in error_text.split('\n'):
-                if '→' in line or '->' in line:
-                    parts = re.split(r'→|->',  line.strip().lstrip('- '))
-                    if len(parts) == 2:
-                        step.error_handling.append({
-                            'condition': parts[0].strip(),
-                            'action': parts[1].strip()
-                        })
+        for heading, lines in sections.items():
+            # Extract Task
+            if heading == 'task':
+                step.task = '\n'.join(lines).strip()
+            
+            # Extract Dependencies (commands from code blocks)
+            elif heading == 'dependencies':
+                deps_text = '\n'.join(lines)
+                step.dependencies = [
+                    cmd
+                    for block in _DEPS_CMD_RE.finditer(deps_text)
+                    for line in block.group(1).splitlines()
+                    if (cmd := line.strip())
+                ]
+            
+            # Extract Save as (first non-blank line, optionally quoted)
+            elif heading == 'save as':
+                save_line = next((text for line in lines if (text := line.strip())), None)
+                save_match = _SAVE_RE.match(save_line) if save_line else None
+                if save_match:
+                    step.save_as = save_match.group(1)
+            
+            # Extract Success criteria
+            elif heading == 'success criteria':
+                step.success_criteria = [
+                    m.group(1)
+                    for line in lines
+                    if (m := _BULLET_RE.match(line))
+                ]
+            
+            # Extract Constraints
+            elif heading == 'constraints':
+                step.constraints = [
+                    m.group(1)
+                    for line in lines
+                    if (m := _BULLET_RE.match(line))
+                ]
+            
+            # Extract Error handling
+            elif heading == 'if something goes wrong':
+                for line in lines:
+                    if '→' in line or '->' in line:
+                        parts = line.strip().lstrip('- ').replace('→', '->').split('->', 1)
+                        if len(parts) == 2:
+                            step.error_handling.append({
+                                'condition': parts[0].strip(),
+                                'action': parts[1].strip()
+                            })
+            
+            # Extract Flexibility (heading may carry a level, e.g. "Flexibility [strict]")
+            elif heading.startswith('flexibility') and not has_flexibility:
+                flex_match = _FLEX_HEADING_RE.fullmatch(heading)
+                if flex_match:
+                    has_flexibility = True
+                    if flex_match.group(1):
+                        step.flexibility_level = flex_match.group(1)
+                    step.flexibility = '\n'.join(lines).strip()
         
         return step
     
-    def _validate_structure(self):
+    def _validate_structure(self) -> None:
         """Validate overall document structure"""
         # Must have title
         if not self.title:
@@ -196,8 +310,9 @@ class WorkflowValidator:
         if not self.finalization:
             self.warnings.append("Consider adding a Finalization section")
     
-    def _validate_steps(self):
+    def _validate_steps(self) -> None:
         """Validate individual steps"""
+        step_count = len(self.steps)
         for step in self.steps:
             prefix = f"Step {step.number}"
             
@@ -211,11 +326,11 @@ class WorkflowValidator:
             if step.flexibility_level not in self.VALID_FLEXIBILITY_LEVELS:
                 self.errors.append(
                     f"{prefix}: Invalid flexibility level '{step.flexibility_level}'. "
-                    f"Must be one of: {', '.join(self.VALID_FLEXIBILITY_LEVELS)}"
+                    f"Must be one of: {self._FLEXIBILITY_LEVELS_TEXT}"
                 )
             
             # Warn if no save_as for steps that produce output
-            if not step.save_as and step.number < len(self.steps):
+            if not step.save_as and step.number < step_count:
                 self.warnings.append(f"{prefix}: Consider adding 'Save as' to create contract for next step")
             
             # Warn if no success criteria
@@ -227,7 +342,7 @@ class WorkflowValidator:
                 if not step.save_as.startswith('/'):
                     self.warnings.append(f"{prefix}: 'Save as' path should be absolute (start with /)")
     
-    def _validate_step_flow(self):
+    def _validate_step_flow(self) -> None:
         """Validate step numbering and flow"""
         if not self.steps:
             return
@@ -239,18 +354,17 @@ class WorkflowValidator:
             self.errors.append("Duplicate step numbers found")
         
         # Check for sequential numbering
+        ordered = sorted(numbers)
         expected = list(range(1, len(self.steps) + 1))
-        if sorted(numbers) != expected:
+        if ordered != expected:
             self.warnings.append(
-                f"Step numbers are not sequential. Found: {sorted(numbers)}, "
+                f"Step numbers are not sequential. Found: {ordered}, "
                 f"Expected: {expected}"
             )
         
         # Check for gaps
-        for i in range(len(numbers) - 1):
-            if sorted(numbers)[i + 1] - sorted(numbers)[i] > 1:
-                self.warnings.append("Gap in step numbering detected")
-                break
+        if any(b - a > 1 for a, b in zip(ordered, ordered[1:])):
+            self.warnings.append("Gap in step numbering detected")
 
 
 def validate_file(filepath: str) -> ValidationResult:
@@ -274,7 +388,24 @@ def validate_file(filepath: str) -> ValidationResult:
     return validator.validate()
 
 
-def main():
+def validate_many(paths: Iterable[str]) -> list[ValidationResult]:
+    """Validate several workflow files, returning the results in input order"""
+    return [validate_file(path) for path in paths]
+
+
+def _dumps(obj: Any) -> bytes:
+    """Serialize CLI output as UTF-8 JSON, pretty-printed only for a terminal"""
+    pretty = sys.stdout.isatty()
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+    if pretty:
+        text = json.dumps(obj, indent=2, ensure_ascii=False)
+    else:
+        text = json.dumps(obj, separators=(',', ':'), ensure_ascii=False)
+    return text.encode('utf-8')
+
+
+def main() -> None:
     """CLI entry point"""
     if len(sys.argv) < 2:
         print("Usage: python validate.py <workflow.md>")
@@ -293,7 +424,15 @@ def main():
             'warnings': result.warnings,
             'info': result.info
         }
-        print(json.dumps(output, indent=2))
+        # Write bytes so the output is UTF-8 whatever the stdout encoding;
+        # text-only streams (StringIO, IDLE) have no buffer to write to
+        buf = getattr(sys.stdout, 'buffer', None)
+        if buf is None:
+            print(_dumps(output).decode('utf-8'))
+        else:
+            sys.stdout.flush()
+            buf.write(_dumps(output) + b'\n')
+            buf.flush()
     else:
         # Human-readable output
         print(f"\n{'='*60}")